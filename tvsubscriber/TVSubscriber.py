@@ -1,49 +1,284 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from itertools import chain
 from json import JSONDecodeError
 import httpx
-from typing import Literal, Optional, Union
-
-from tvsubscriber.utils.const import API, MLSUB, NETWORKS
+from typing import Iterable, Iterator, Literal, Optional, Union, get_args
+from urllib.parse import quote, urlencode
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+from tvsubscriber.utils.cache import TTLCache
+from tvsubscriber.utils.const import (API, CACHE_TTL_CHANNELS, CACHE_TTL_ONLINE, CACHE_TTL_USERINFO, CONNECT_RETRIES,
+                                      HTTP2_AVAILABLE, MAX_RETRIES, MLSUB, NETWORKS, NETWORKS_SET, RETRY_BACKOFF, RETRY_STATUS,
+                                      USER_AGENT)
 from tvsubscriber.utils.errors import ApiException
-from tvsubscriber.models import Channel, Event, Reservation, UserInfo
+from tvsubscriber.models import (CHANNEL_LIST_ADAPTER, EVENT_LIST_ADAPTER, Channel, Event, EventLite, Reservation, UserInfo,
+                                 _unique_instances)
+
+
+class _URL:
+    # absolute urls of `API`, built once at import. a relative url would be parsed and joined with base_url by httpx
+    # on every request, which costs more than building the rest of the request
+    LOGIN = httpx.URL(MLSUB + API.LOGIN)
+    GET_CHANNEL = httpx.URL(MLSUB + API.GET_CHANNEL)
+    GET_EPG = httpx.URL(MLSUB + API.GET_EPG)
+    SUBSCRIBE = httpx.URL(MLSUB + API.SUBSCRIBE)
+    USERINFO = httpx.URL(MLSUB + API.USERINFO)
+    GET_ORDER = httpx.URL(MLSUB + API.GET_ORDER)
+
+
+def _parse_json(resp: httpx.Response, msg=''):
+    # assert decoded json and raise ApiException with msg
+    try:
+        json = json_loads(resp.content)
+        return json
+    except JSONDecodeError as e:
+        raise ApiException(msg or e)
+
+
+def _form(token_form: str, fields: dict) -> str:
+    # build the urlencoded body by hand: the token part is quoted once at login, only the varying fields are encoded here
+    return f'{token_form}&{urlencode({name: _form_value(value) for name, value in fields.items()})}'
+
+
+def _form_value(value):
+    # same as httpx's `data=` encoding, urlencode alone would send None as 'None' and bools as 'True'/'False'
+    if value is None:
+        return ''
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    return value
+
+
+def _raise_for_json_status(json: dict, msg=''):
+    # assert json status
+    if json.get('response_code') != 200:
+        raise ApiException(msg + (json.get('information') or ''), response_json=json)
+    return json
+
+
+def _parse_channels(json: dict, network: NETWORKS) -> list[Channel]:
+    if 'channels' not in json:
+        raise ApiException('频道列表响应信息格式错误！', response_json=json)
+    try:
+        channels = CHANNEL_LIST_ADAPTER.validate_python([dict(channel, network=network) for channel in json['channels']])
+        channels = _unique_instances(channels)
+    except Exception as e:
+        raise ApiException('频道列表响应信息格式错误！' + str(e), response_json=json)
+    return channels
+
+
+def _usable_events(raw_events: Iterable[dict], include_ext_text: bool) -> Iterator[dict]:
+    # skip placeholder events (e.g. 放送休止) that lack a name, text or category, see `_parse_events`
+    for event in raw_events:
+        if not (event.get('event_name') and event.get('event_text') and event.get('category')):
+            continue
+        if not include_ext_text:
+            # drop the (often huge) synopsis from the raw dict as well
+            event.pop('event_ext_text', None)
+        yield event
+
+
+def _parse_events(json: dict, sid: Union[int, str], include_ext_text: bool = True,
+                  raw_events: Iterable[dict] = None) -> list[Event]:
+    # raw_events: events to parse instead of json['events'], e.g. yielded by `_iter_events`
+    # on fail:
+    # {'response_code': 403, 'responsetime': '2023-05-08 17:08:46', 'information': 'EPG Token错误'}
+    # note: egptoken可能会随时间改变
+    # empty events:
+    # {'response_code': 200,
+    #  'responsetime': '2023-06-18 15:37:02',
+    #  'service': None,
+    #  'mins30price': '3.5',
+    #  'count': None,
+    #  'events': []}
+    if 'events' not in json:
+        raise ApiException(f'频道sid={sid}的节目响应信息格式错误！', response_json=json)
+    try:
+        if raw_events is None:
+            # validate the whole list in a single pydantic-core pass
+            events = EVENT_LIST_ADAPTER.validate_python(list(_usable_events(json['events'], include_ext_text)))
+        else:
+            # streamed, validate one by one so that each raw dict can be released right away
+            events = [Event.model_validate(event) for event in _usable_events(raw_events, include_ext_text)]
+        events = _unique_instances(events)
+    except ApiException:
+        # raised by `_iter_events` on a malformed stream, already carries its own message
+        raise
+    except Exception as e:
+        # bad event:
+        # { 'sid': '17408',
+        #  'tsid': '32480',
+        #  'onid': '32480',
+        #  'eid': '59722',
+        #  'service': 'ＮＨＫ総合１・仙台',
+        #  'startdate': '2023/06/19',
+        #  'starttime': '01:25:00',
+        #  'timestamp': 1687109100,
+        #  'week': '1',
+        #  'week_text': '月',
+        #  'duration': 155,
+        #  'event_name': '放送休止', | None
+        #  'event_text': '节目无说明信息',
+        #  'event_ext_text': '节目无补充信息',
+        #  'category': None,
+        #  'resolution': '1080i',
+        #  'network': 'Other',
+        #  'price': 120,
+        #  'reservetoken': '1c293c701da634da2b5f1ae3b64ef931'}
+        raise ApiException('节目响应信息格式错误！' + str(e), response_json=json)
+
+    return events
+
+
+def _iter_events(chunks: Iterable[bytes], json: dict) -> Iterator[dict]:
+    """
+    incrementally parse an EPG response with ijson, yielding raw event dicts one at a time.
+    top-level fields are stored into `json` as they arrive, `json['events']` is left empty.
+    """
+    parsed = ijson.sendable_list()
+    coro = ijson.parse_coro(parsed, use_float=True)
+    builder = None
+    try:
+        for chunk in chunks:
+            coro.send(chunk)
+            for prefix, event, value in parsed:
+                if builder is not None:
+                    builder.event(event, value)
+                    if prefix == 'events.item' and event == 'end_map':
+                        yield builder.value
+                        builder = None
+                elif prefix == 'events.item' and event == 'start_map':
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                elif prefix == 'events' and event == 'start_array':
+                    json['events'] = []
+                elif prefix and '.' not in prefix and event in ('string', 'number', 'boolean', 'null'):
+                    json[prefix] = value
+            del parsed[:]
+        coro.close()
+    except ijson.JSONError as e:
+        raise ApiException(str(e))
+
+
+def _post(client: httpx.Client, url, retries: int = MAX_RETRIES, **kwargs) -> httpx.Response:
+    # retry network errors and `RETRY_STATUS` responses with exponential backoff
+    for attempt in range(retries + 1):
+        try:
+            resp = client.post(url, **kwargs)
+        except httpx.TransportError:
+            if attempt == retries:
+                raise
+        else:
+            if resp.status_code not in RETRY_STATUS or attempt == retries:
+                return resp
+        time.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+
+@contextmanager
+def _post_stream(client: httpx.Client, url, retries: int = MAX_RETRIES, **kwargs) -> Iterator[httpx.Response]:
+    # streaming version of `_post`. only opening the response is retried, i.e. up to the status line and headers,
+    # a failure after the body started being consumed propagates
+    for attempt in range(retries + 1):
+        stack = ExitStack()
+        try:
+            resp = stack.enter_context(client.stream('POST', url, **kwargs))
+        except httpx.TransportError:
+            if attempt == retries:
+                raise
+        else:
+            if resp.status_code not in RETRY_STATUS or attempt == retries:
+                break
+            stack.close()
+        time.sleep(RETRY_BACKOFF * 2 ** attempt)
+    with stack:
+        yield resp
+
+
+async def _apost(client: httpx.AsyncClient, url, retries: int = MAX_RETRIES, **kwargs) -> httpx.Response:
+    # async version of `_post`
+    for attempt in range(retries + 1):
+        try:
+            resp = await client.post(url, **kwargs)
+        except httpx.TransportError:
+            if attempt == retries:
+                raise
+        else:
+            if resp.status_code not in RETRY_STATUS or attempt == retries:
+                return resp
+        await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+
+def _run(coro):
+    # asyncio.run() refuses to start inside a running event loop (e.g. jupyter), use a worker thread there instead
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
 
 
 # 不同api返回的id数据类型不一样，内部统一以str处理
 class TVSubscriber:
-    def __init__(self):
+    """
+    Parameters
+    ----
+    cache_size:
+        最多缓存的接口结果数量，为0时不缓存
+    cache_ttl:
+        EPG缓存有效期（秒）
+    """
+    def __init__(self, cache_size: int = 256, cache_ttl: float = 60):
         # TODO 登陆后从线上获取已订阅的列表，不能本地保存
         self._client = self._default_client()
         self._username = ''
         self._password = ''
         self._token = ''
+        self._token_form = 'token='
         self.last_json = {}
         self._last_resp = None  # type: Optional[httpx.Response]
+        self._cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
 
     @staticmethod
     def _default_client() -> httpx.Client:
         return httpx.Client(
             base_url=MLSUB,
             headers={
-                "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:108.0) Gecko/20100101 Firefox/108.0",
+                "user-agent": USER_AGENT,
+                # every endpoint takes a form body, see `_form`
+                "content-type": "application/x-www-form-urlencoded",
             },
-            timeout=10,
+            transport=httpx.HTTPTransport(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60),
+                retries=CONNECT_RETRIES,
+            ),
+            timeout=httpx.Timeout(30, connect=10),
             # proxies={
             #     "all://": "http://localhost:9999",
             # }
         )
 
-    def _parse_json(self, msg=''):
-        # assert decoded json and raise ApiException with msg
-        try:
-            json = self._last_resp.json()
-            return json
-        except JSONDecodeError as e:
-            raise ApiException(msg or e)
-
-    def _raise_for_json_status(self, msg=''):
-        # assert json status
-        if self.last_json['response_code'] != 200:
-            raise ApiException(msg + (self.last_json.get('information') or ''), response_json=self.last_json)
-        return self.last_json
+    def _check(self, msg='', decode_msg='') -> dict:
+        # assert http status, decoded json and json status of `_last_resp` in one call, raise ApiException with msg
+        resp = self._last_resp
+        if resp.status_code != 200:
+            resp.raise_for_status()
+        self.last_json = _parse_json(resp, decode_msg)
+        return _raise_for_json_status(self.last_json, msg)
 
     def login(self, username: str, password: str, **kwargs) -> dict:
         """
@@ -76,25 +311,25 @@ class TVSubscriber:
              'information': '已成功登陆用户：xxxx'}
 
         """
-        self._last_resp = self._client.post(
-            API.LOGIN,
+        self._last_resp = _post(
+            self._client,
+            _URL.LOGIN,
             data={
                 'username': username,
                 'password': password,
             },
             **kwargs
         )
-        # assert status_code
-        self._last_resp.raise_for_status()
-        self.last_json = self._parse_json()
         # on fail:
         # {'response_code': 403,
         #  'responsetime': '2023-05-08 15:05:09',
         #  'information': '登陆失败，请重试！您当前已尝试：1次'}
-        self._raise_for_json_status('登陆失败')
+        self._check('登陆失败')
         self._username = username
         self._password = password
         self._token = self.last_json['onlinetoken']
+        self._token_form = 'token=' + quote(self._token, safe='')
+        self._cache.invalidate()
         print(f'{self=}')
         return self.last_json
 
@@ -102,6 +337,8 @@ class TVSubscriber:
         """
         获取频道列表，名称与取值对应关系见`NETWORK_NAMES`
 
+        结果缓存`CACHE_TTL_CHANNELS`秒，需要强制刷新时先调用`invalidate('get_channels')`
+
         raise `ApiException` on fail
 
         Parameters
@@ -136,32 +373,33 @@ class TVSubscriber:
             },...
           ]}
         """
-        self._last_resp = self._client.post(
-            API.GET_CHANNEL,
-            data={
-                'token': self._token,
+        if network not in NETWORKS_SET:
+            raise ApiException(f'获取{network}频道列表失败！网络名错误')
+        key = ('get_channels', network)
+        channels = self._cache.get(key, CACHE_TTL_CHANNELS)
+        if channels is not None:
+            # cached as a tuple, hand out a fresh list so that callers cannot modify the cache
+            return list(channels)
+        self._last_resp = _post(
+            self._client,
+            _URL.GET_CHANNEL,
+            content=_form(self._token_form, {
                 'network': network
-            },
+            }),
             **kwargs
         )
-        # assert status_code
-        self._last_resp.raise_for_status()
-        # .json() is None if failed
-        self.last_json = self._parse_json('网络名错误')
-        self._raise_for_json_status(f'获取{network}频道列表失败！')
-        if 'channels' not in self.last_json:
-            raise ApiException('频道列表响应信息格式错误！', response_json=self.last_json)
-        try:
-            channels = [Channel(**channel, network=network) for channel in self.last_json['channels']]
-        except Exception as e:
-            raise ApiException('频道列表响应信息格式错误！' + str(e), response_json=self.last_json)
-
+        self._check(f'获取{network}频道列表失败！', '网络名错误')
+        channels = _parse_channels(self.last_json, network)
+        self._cache.set(key, tuple(channels))
         return channels
 
-    def get_epgs(self, sid: Union[int, str], network: NETWORKS, epgtoken: str, tsid: Union[int, str] = None, **kwargs) -> list[Event]:
+    def get_epgs(self, sid: Union[int, str], network: NETWORKS, epgtoken: str, tsid: Union[int, str] = None,
+                 include_ext_text: bool = True, stream: bool = False, **kwargs) -> list[Event]:
         """
         获取EPG，即指定频道的具体节目表
 
+        结果按`(sid, tsid, network, epgtoken)`缓存`cache_ttl`秒，epgtoken刷新后自然失效
+
         raise `ApiException` on fail
 
         Parameters
@@ -174,6 +412,11 @@ class TVSubscriber:
             频道所属网络
         epgtoken:
             请求EPG需要的token
+        include_ext_text:
+            是否保留节目补充说明`event_ext_text`，不需要时设为False可以节省大量内存
+        stream:
+            是否边下载边解析响应以降低内存峰值，需要安装`ijson`，未安装时忽略。
+            此时`last_json`只包含顶层字段，`last_json['events']`为空列表
 
         Returns
         ----
@@ -234,59 +477,109 @@ class TVSubscriber:
              }, ...]
          }
         """
+        # the last item tells `EventLite` lists apart, see `get_epgs_many`
+        key = ('get_epgs', sid, tsid, network, epgtoken, include_ext_text, False)
+        events = self._cache.get(key)
+        if events is not None:
+            # see `get_channels`
+            return list(events)
         data = {
-            'token': self._token,
             'sid': sid,
             'network': network,
             'epgtoken': epgtoken
         }
         if tsid:
             data['tsid'] = tsid
-        self._last_resp = self._client.post(API.GET_EPG, data=data, **kwargs)
-        # assert status_code
-        self._last_resp.raise_for_status()
-        self.last_json = self._parse_json()
-        # on fail:
-        # {'response_code': 403, 'responsetime': '2023-05-08 17:08:46', 'information': 'EPG Token错误'}
-        # note: egptoken可能会随时间改变
-        # empty events:
-        # {'response_code': 200,
-        #  'responsetime': '2023-06-18 15:37:02',
-        #  'service': None,
-        #  'mins30price': '3.5',
-        #  'count': None,
-        #  'events': []}
-        self._raise_for_json_status(f'获取频道sid={sid}的EPG信息失败！')
-        if 'events' not in self.last_json:
-            raise ApiException(f'频道sid={sid}的节目响应信息格式错误！', response_json=self.last_json)
-        try:
-            events = [Event(**event) for event in self.last_json['events']
-                      if event.get('event_name') and event.get('event_text') and event.get('category')]
-        except Exception as e:
-            # bad event:
-            # { 'sid': '17408',
-            #  'tsid': '32480',
-            #  'onid': '32480',
-            #  'eid': '59722',
-            #  'service': 'ＮＨＫ総合１・仙台',
-            #  'startdate': '2023/06/19',
-            #  'starttime': '01:25:00',
-            #  'timestamp': 1687109100,
-            #  'week': '1',
-            #  'week_text': '月',
-            #  'duration': 155,
-            #  'event_name': '放送休止', | None
-            #  'event_text': '节目无说明信息',
-            #  'event_ext_text': '节目无补充信息',
-            #  'category': None,
-            #  'resolution': '1080i',
-            #  'network': 'Other',
-            #  'price': 120,
-            #  'reservetoken': '1c293c701da634da2b5f1ae3b64ef931'}
-            raise ApiException('节目响应信息格式错误！' + str(e), response_json=self.last_json)
-
+        if stream and ijson is not None:
+            with _post_stream(self._client, _URL.GET_EPG, content=_form(self._token_form, data), **kwargs) as resp:
+                self._last_resp = resp
+                if resp.status_code != 200:
+                    resp.raise_for_status()
+                self.last_json = {}
+                raw_events = _iter_events(resp.iter_bytes(), self.last_json)
+                # parse up to the first event so that the top-level status is known before building any Event
+                first = next(raw_events, None)
+                if first is not None:
+                    raw_events = chain((first,), raw_events)
+                _raise_for_json_status(self.last_json, f'获取频道sid={sid}的EPG信息失败！')
+                events = _parse_events(self.last_json, sid, include_ext_text, raw_events)
+        else:
+            self._last_resp = _post(self._client, _URL.GET_EPG, content=_form(self._token_form, data), **kwargs)
+            self._check(f'获取频道sid={sid}的EPG信息失败！')
+            events = _parse_events(self.last_json, sid, include_ext_text)
+        self._cache.set(key, tuple(events))
         return events
 
+    def get_epgs_many(self, requests: list[tuple[Union[int, str], Optional[Union[int, str]], str]], network: NETWORKS,
+                      concurrency: int = 8, include_ext_text: bool = True, lite: bool = False,
+                      **kwargs) -> dict[Union[int, str], Union[list[Event], list[EventLite]]]:
+        """
+        并发获取同一网络下多个频道的EPG。安装`h2`且服务器支持HTTP/2时请求复用同一条连接
+
+        raise `ApiException` on fail
+
+        Parameters
+        ----
+        requests:
+            由`(sid, tsid, epgtoken)`组成的列表，不需要tsid时传None
+        network:
+            频道所属网络
+        concurrency:
+            同时进行的请求数上限
+        include_ext_text:
+            是否保留节目补充说明，同`get_epgs`
+        lite:
+            为True时返回`EventLite`而非`Event`，适合大批量抓取后去重、预约等只需少量字段的场景，可大幅降低内存占用
+
+        Returns
+        ----
+        dict[sid, list[Event]]: 频道SID到节目列表的映射，详见`models.Event`；`lite=True`时为`list[EventLite]`
+        """
+        return _run(self._gather_epgs(requests, network, concurrency, include_ext_text, lite, **kwargs))
+
+    def _fanout_client(self, concurrency: int) -> httpx.AsyncClient:
+        # short-lived async client for concurrent requests. `h2` being installed does not mean the server negotiates
+        # HTTP/2, so allow one connection per in-flight request. once HTTP/2 is up, httpcore multiplexes onto it anyway
+        return httpx.AsyncClient(
+            base_url=MLSUB,
+            headers=self._client.headers,
+            transport=httpx.AsyncHTTPTransport(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+                retries=CONNECT_RETRIES,
+            ),
+            timeout=self._client.timeout,
+        )
+
+    async def _gather_epgs(self, requests, network, concurrency, include_ext_text, lite, **kwargs):
+        semaphore = asyncio.Semaphore(concurrency)
+        async with self._fanout_client(concurrency) as client:
+            async def fetch(sid, tsid, epgtoken):
+                key = ('get_epgs', sid, tsid, network, epgtoken, include_ext_text, lite)
+                events = self._cache.get(key)
+                if events is not None:
+                    return list(events)
+                data = {
+                    'sid': sid,
+                    'network': network,
+                    'epgtoken': epgtoken
+                }
+                if tsid:
+                    data['tsid'] = tsid
+                async with semaphore:
+                    resp = await _apost(client, _URL.GET_EPG, content=_form(self._token_form, data), **kwargs)
+                self._last_resp = resp
+                self._check(f'获取频道sid={sid}的EPG信息失败！')
+                events = _parse_events(self.last_json, sid, include_ext_text)
+                if lite:
+                    # only keep the lite lists alive, caching the full events would defeat the memory saving
+                    events = [event.to_lite() for event in events]
+                self._cache.set(key, tuple(events))
+                return events
+
+            results = await asyncio.gather(*(fetch(*request) for request in requests))
+        return {request[0]: events for request, events in zip(requests, results)}
+
     def subscribe(self, sid: Union[int, str], eid: Union[int, str], tsid: Union[int, str], onid: Union[int, str],
                   price: Union[int, float], network: str, reservetoken: str, **kwargs) -> Reservation:
         """
@@ -356,10 +649,10 @@ class TVSubscriber:
            'server': 0}
           }
         """
-        self._last_resp = self._client.post(
-            API.SUBSCRIBE,
-            data={
-                'token': self._token,
+        self._last_resp = _post(
+            self._client,
+            _URL.SUBSCRIBE,
+            content=_form(self._token_form, {
                 'sid': sid,
                 'eid': eid,
                 'tsid': tsid,
@@ -367,14 +660,13 @@ class TVSubscriber:
                 'price': price,
                 'network': network,
                 'reservetoken': reservetoken
-            },
+            }),
+            # not idempotent, a retried request may order the same event twice
+            retries=0,
             **kwargs,
             timeout=30,
         )
-        # assert status_code
-        self._last_resp.raise_for_status()
-        self.last_json = self._parse_json()
-        self._raise_for_json_status(f'预约失败！reservetoken={reservetoken}')
+        self._check(f'预约失败！reservetoken={reservetoken}')
         # on fail:
         # {'response_code': 403,
         #  'responsetime': '2023-05-08 18:32:31',
@@ -386,12 +678,16 @@ class TVSubscriber:
         except Exception as e:
             raise ApiException('预约结果响应信息格式错误！' + str(e), response_json=self.last_json)
 
+        # wallet changed
+        self._cache.invalidate('get_userinfo')
         return reservation
 
     def get_userinfo(self, **kwargs) -> UserInfo:
         """
         获取账户信息
 
+        结果缓存`CACHE_TTL_USERINFO`秒，需要强制刷新时先调用`invalidate('get_userinfo')`
+
         raise `ApiException` on fail
 
         Returns
@@ -428,19 +724,19 @@ class TVSubscriber:
               'lasttime': '2023-05-08 18:05:52',
               'times_draw': '0'}}
         """
-        self._last_resp = self._client.post(
-            API.USERINFO,
-            data={
-                'token': self._token,
-            },
+        key = ('get_userinfo',)
+        userinfo = self._cache.get(key, CACHE_TTL_USERINFO)
+        if userinfo is not None:
+            return userinfo
+        self._last_resp = _post(
+            self._client,
+            _URL.USERINFO,
+            content=self._token_form,
             **kwargs
         )
-        # assert status_code
-        self._last_resp.raise_for_status()
-        self.last_json = self._parse_json()
         # error example:
         # {'response_code': 401, 'responsetime': '2023-06-12 22:05:51', 'information': '鉴权失败，Token错误'}
-        self._raise_for_json_status('获取用户信息失败！')
+        self._check('获取用户信息失败！')
         if 'userinfo' not in self.last_json:
             raise ApiException('用户信息响应信息格式错误！', response_json=self.last_json)
         try:
@@ -448,6 +744,7 @@ class TVSubscriber:
         except Exception as e:
             raise ApiException('用户信息响应信息格式错误！' + str(e), response_json=self.last_json)
 
+        self._cache.set(key, userinfo)
         return userinfo
 
     def get_order(self,
@@ -527,7 +824,6 @@ class TVSubscriber:
              }
         """
         data = {
-            'token': self._token,
             'index': index,
             'count': count,
             'order': order,
@@ -541,19 +837,74 @@ class TVSubscriber:
         if operator:
             data['operator'] = operator
 
-        self._last_resp = self._client.post(API.GET_ORDER, data=data, **kwargs)
-        # assert status_code
-        self._last_resp.raise_for_status()
-        self.last_json = self._parse_json()
-        self._raise_for_json_status('获取预约列表失败！')
+        self._last_resp = _post(self._client, _URL.GET_ORDER, content=_form(self._token_form, data), **kwargs)
+        self._check('获取预约列表失败！')
         return self.last_json
 
+    def warmup(self, username: str, password: str, **kwargs) -> dict[str, list[Channel]]:
+        """
+        登陆后并发获取所有网络的频道列表，结果同时写入`get_channels`的缓存
+
+        raise `ApiException` on fail
+
+        Parameters
+        ----
+        username: str
+            用户名
+        password: str
+            密码
+
+        Returns
+        ----
+        dict[str, list[Channel]]: 网络到频道列表的映射，网络取值详见`NETWORKS`
+        """
+        self.login(username, password)
+        return _run(self._gather_channels(get_args(NETWORKS), **kwargs))
+
+    async def _gather_channels(self, networks, **kwargs):
+        async with self._fanout_client(len(networks)) as client:
+            async def fetch(network):
+                resp = await _apost(
+                    client,
+                    _URL.GET_CHANNEL,
+                    content=_form(self._token_form, {
+                        'network': network
+                    }),
+                    **kwargs
+                )
+                self._last_resp = resp
+                self._check(f'获取{network}频道列表失败！', '网络名错误')
+                channels = _parse_channels(self.last_json, network)
+                self._cache.set(('get_channels', network), tuple(channels))
+                return channels
+
+            results = await asyncio.gather(*(fetch(network) for network in networks))
+        return dict(zip(networks, results))
+
+    def invalidate(self, method: str = None):
+        """
+        清除缓存，之后的调用会重新请求接口
+
+        Parameters
+        ----
+        method: str
+            要清除缓存的方法名，如`'get_channels'`，`'get_userinfo'`；为None时清除所有缓存
+        """
+        self._cache.invalidate(method)
+
     def is_online(self) -> bool:
+        # polled frequently, reuse the result for a few seconds. login() clears it along with the other caches
+        key = ('is_online',)
+        online = self._cache.get(key, CACHE_TTL_ONLINE)
+        if online is not None:
+            return online
+        # get_userinfo is cached much longer, make sure the probe actually reaches the server
+        self._cache.invalidate('get_userinfo')
         try:
             user = self.get_userinfo()
             # print('last json:', self.last_json)
             assert user.online == UserInfo.__ONLINE__
-            return True
+            online = True
         except (ApiException, AssertionError):
             try:
                 print('relogin with', self._username, self._password)
@@ -561,16 +912,28 @@ class TVSubscriber:
                 return self.is_online()
             except ApiException:
                 print('relogin fail!')
-                return False
+                online = False
+        self._cache.set(key, online)
+        return online
+
+    def close(self):
+        self._client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def __repr__(self):
         return f'TVSubscriber("{self._username}", "{self._password}", "{self._token}")'
 
     def __copy__(self):
-        new_object = self.__class__()
+        new_object = self.__class__(cache_size=self._cache.maxsize, cache_ttl=self._cache.ttl)
         new_object._username = self._username
         new_object._password = self._password
         new_object._token = self._token
+        new_object._token_form = self._token_form
         # print(f'{self=}')
         # print(f'{new_object=}')
         return new_object
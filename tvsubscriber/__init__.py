@@ -1,6 +1,57 @@
-from tvsubscriber.TVSubscriber import TVSubscriber
-from tvsubscriber.models import Channel, Event, Reservation, UserInfo
-from tvsubscriber.utils.const import NETWORK_NAMES, NETWORKS
+import sys
+from types import ModuleType
+
+from tvsubscriber.utils.const import NETWORK_NAMES, NETWORKS, NETWORKS_SET
 from tvsubscriber.utils.errors import ApiException
 
-__all__ = ('TVSubscriber', 'Channel', 'Event', 'Reservation', 'UserInfo', 'ApiException', 'NETWORK_NAMES', 'NETWORKS')
+__all__ = ('TVSubscriber', 'AsyncTVSubscriber', 'Channel', 'Event', 'EventLite', 'Reservation', 'UserInfo', 'ApiException', 'NETWORK_NAMES', 'NETWORKS', 'NETWORKS_SET')
+
+# httpx and pydantic are slow to import, load the modules depending on them on first access (PEP 562)
+_LAZY = {
+    'AsyncTVSubscriber': 'tvsubscriber.async_api',
+    'Channel': 'tvsubscriber.models',
+    'Event': 'tvsubscriber.models',
+    'EventLite': 'tvsubscriber.models',
+    'Reservation': 'tvsubscriber.models',
+    'UserInfo': 'tvsubscriber.models',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        from importlib import import_module
+        value = getattr(import_module(_LAZY[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY) | {'TVSubscriber'})
+
+
+class _Package(ModuleType):
+    # `TVSubscriber` is also the name of a submodule. importing `tvsubscriber.TVSubscriber` (directly, or through
+    # async_api) binds the submodule as an attribute of this package, and a module-level __getattr__ would never run
+    # again for that name. a data descriptor on the module class takes precedence over that binding
+    @property
+    def TVSubscriber(self):
+        if '_TVSubscriber' in self.__dict__:
+            return self.__dict__['_TVSubscriber']
+        from tvsubscriber.TVSubscriber import TVSubscriber
+        return TVSubscriber
+
+    @TVSubscriber.setter
+    def TVSubscriber(self, value):
+        # the import system sets the submodule, which stays reachable through sys.modules. keep anything else
+        # (e.g. a monkeypatched class)
+        if isinstance(value, ModuleType):
+            return
+        self.__dict__['_TVSubscriber'] = value
+
+    @TVSubscriber.deleter
+    def TVSubscriber(self):
+        self.__dict__.pop('_TVSubscriber', None)
+
+
+sys.modules[__name__].__class__ = _Package
@@ -0,0 +1,266 @@
+import asyncio
+import httpx
+from typing import Iterable, Literal, Optional, Union
+from urllib.parse import quote
+
+from tvsubscriber.utils.cache import TTLCache
+from tvsubscriber.utils.const import (CACHE_TTL_CHANNELS, CACHE_TTL_USERINFO, CONNECT_RETRIES, HTTP2_AVAILABLE, MLSUB,
+                                      NETWORKS, NETWORKS_SET, USER_AGENT)
+from tvsubscriber.utils.errors import ApiException
+from tvsubscriber.models import Channel, Event, EventLite, Reservation, UserInfo
+from tvsubscriber.TVSubscriber import _URL, _apost, _form, _parse_channels, _parse_events, _parse_json, _raise_for_json_status
+
+
+class AsyncTVSubscriber:
+    """
+    `TVSubscriber`的异步版本，基于`httpx.AsyncClient`，可以并发请求多个频道的EPG。
+    各接口的参数、返回值与异常与`TVSubscriber`中的同名方法一致，构造参数同`TVSubscriber`，另外：
+
+    max_concurrency:
+        同一实例同时进行的请求数上限，避免并发过高被服务器限流
+
+    Example:
+        async with AsyncTVSubscriber() as subscriber:
+            await subscriber.login(username, password)
+            channels = await subscriber.get_channels('Kanto')
+            epgs = await subscriber.get_epgs_bulk(channels)
+    """
+    def __init__(self, cache_size: int = 256, cache_ttl: float = 60, max_concurrency: int = 16):
+        self._client = self._default_client()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._username = ''
+        self._password = ''
+        self._token = ''
+        self._token_form = 'token='
+        self.last_json = {}
+        self._last_resp = None  # type: Optional[httpx.Response]
+        self._cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+
+    @staticmethod
+    def _default_client() -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=MLSUB,
+            headers={
+                "user-agent": USER_AGENT,
+                # every endpoint takes a form body, see `_form`
+                "content-type": "application/x-www-form-urlencoded",
+            },
+            transport=httpx.AsyncHTTPTransport(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                retries=CONNECT_RETRIES,
+            ),
+            timeout=30,
+        )
+
+    async def _post(self, url, **kwargs) -> httpx.Response:
+        async with self._semaphore:
+            return await _apost(self._client, url, **kwargs)
+
+    def _check(self, msg='', decode_msg='') -> dict:
+        # assert http status, decoded json and json status of `_last_resp` in one call, raise ApiException with msg
+        resp = self._last_resp
+        if resp.status_code != 200:
+            resp.raise_for_status()
+        self.last_json = _parse_json(resp, decode_msg)
+        return _raise_for_json_status(self.last_json, msg)
+
+    async def login(self, username: str, password: str, **kwargs) -> dict:
+        """用户登陆，详见`TVSubscriber.login`"""
+        self._last_resp = await self._post(
+            _URL.LOGIN,
+            data={
+                'username': username,
+                'password': password,
+            },
+            **kwargs
+        )
+        self._check('登陆失败')
+        self._username = username
+        self._password = password
+        self._token = self.last_json['onlinetoken']
+        self._token_form = 'token=' + quote(self._token, safe='')
+        self._cache.invalidate()
+        return self.last_json
+
+    async def get_channels(self, network: NETWORKS, **kwargs) -> list[Channel]:
+        """获取频道列表，详见`TVSubscriber.get_channels`"""
+        if network not in NETWORKS_SET:
+            raise ApiException(f'获取{network}频道列表失败！网络名错误')
+        key = ('get_channels', network)
+        channels = self._cache.get(key, CACHE_TTL_CHANNELS)
+        if channels is not None:
+            # cached as a tuple, hand out a fresh list so that callers cannot modify the cache
+            return list(channels)
+        self._last_resp = await self._post(
+            _URL.GET_CHANNEL,
+            content=_form(self._token_form, {
+                'network': network
+            }),
+            **kwargs
+        )
+        self._check(f'获取{network}频道列表失败！', '网络名错误')
+        channels = _parse_channels(self.last_json, network)
+        self._cache.set(key, tuple(channels))
+        return channels
+
+    async def get_epgs(self, sid: Union[int, str], network: NETWORKS, epgtoken: str, tsid: Union[int, str] = None,
+                       include_ext_text: bool = True, **kwargs) -> list[Event]:
+        """获取EPG，详见`TVSubscriber.get_epgs`"""
+        return await self._get_epgs(sid, network, epgtoken, tsid, include_ext_text, False, **kwargs)
+
+    async def _get_epgs(self, sid, network, epgtoken, tsid, include_ext_text, lite, **kwargs):
+        # lite: convert to `EventLite` before caching, see `get_epgs_bulk`
+        key = ('get_epgs', sid, tsid, network, epgtoken, include_ext_text, lite)
+        events = self._cache.get(key)
+        if events is not None:
+            # see `TVSubscriber.get_channels`
+            return list(events)
+        data = {
+            'sid': sid,
+            'network': network,
+            'epgtoken': epgtoken
+        }
+        if tsid:
+            data['tsid'] = tsid
+        self._last_resp = await self._post(_URL.GET_EPG, content=_form(self._token_form, data), **kwargs)
+        self._check(f'获取频道sid={sid}的EPG信息失败！')
+        events = _parse_events(self.last_json, sid, include_ext_text)
+        if lite:
+            events = [event.to_lite() for event in events]
+        self._cache.set(key, tuple(events))
+        return events
+
+    async def get_epgs_bulk(self, channels: Iterable[Channel], concurrency: int = 8, lite: bool = False,
+                            **kwargs) -> dict[Channel, Union[list[Event], list[EventLite]]]:
+        """
+        并发获取多个频道的EPG
+
+        raise `ApiException` on fail
+
+        Parameters
+        ----
+        channels:
+            频道列表，通常为`get_channels`的返回值
+        concurrency:
+            同时进行的请求数上限
+        lite:
+            为True时返回`EventLite`而非`Event`，详见`TVSubscriber.get_epgs_many`
+
+        Returns
+        ----
+        dict[Channel, list[Event]]: 频道到节目列表的映射；`lite=True`时为`list[EventLite]`
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(channel: Channel, include_ext_text: bool = True, **kwargs) -> list[Event]:
+            async with semaphore:
+                return await self._get_epgs(channel.sid, channel.network, channel.epgtoken, channel.tsid,
+                                            include_ext_text, lite, **kwargs)
+
+        channels = list(channels)
+        results = await asyncio.gather(*(fetch(channel, **kwargs) for channel in channels))
+        return dict(zip(channels, results))
+
+    async def subscribe(self, sid: Union[int, str], eid: Union[int, str], tsid: Union[int, str], onid: Union[int, str],
+                        price: Union[int, float], network: str, reservetoken: str, **kwargs) -> Reservation:
+        """预约节目，详见`TVSubscriber.subscribe`"""
+        self._last_resp = await self._post(
+            _URL.SUBSCRIBE,
+            content=_form(self._token_form, {
+                'sid': sid,
+                'eid': eid,
+                'tsid': tsid,
+                'onid': onid,
+                'price': price,
+                'network': network,
+                'reservetoken': reservetoken
+            }),
+            # not idempotent, a retried request may order the same event twice
+            retries=0,
+            **kwargs,
+        )
+        self._check(f'预约失败！reservetoken={reservetoken}')
+        if 'reservation' not in self.last_json:
+            raise ApiException('预约结果响应信息格式错误！', response_json=self.last_json)
+        try:
+            reservation = Reservation(**self.last_json['reservation'])
+        except Exception as e:
+            raise ApiException('预约结果响应信息格式错误！' + str(e), response_json=self.last_json)
+
+        # wallet changed
+        self._cache.invalidate('get_userinfo')
+        return reservation
+
+    async def get_userinfo(self, **kwargs) -> UserInfo:
+        """获取账户信息，详见`TVSubscriber.get_userinfo`"""
+        key = ('get_userinfo',)
+        userinfo = self._cache.get(key, CACHE_TTL_USERINFO)
+        if userinfo is not None:
+            return userinfo
+        self._last_resp = await self._post(
+            _URL.USERINFO,
+            content=self._token_form,
+            **kwargs
+        )
+        self._check('获取用户信息失败！')
+        if 'userinfo' not in self.last_json:
+            raise ApiException('用户信息响应信息格式错误！', response_json=self.last_json)
+        try:
+            userinfo = UserInfo(**self.last_json['userinfo'])
+        except Exception as e:
+            raise ApiException('用户信息响应信息格式错误！' + str(e), response_json=self.last_json)
+
+        self._cache.set(key, userinfo)
+        return userinfo
+
+    async def get_order(self,
+                        index: int = 1,
+                        count: int = 15,
+                        order: Literal['ASC', 'DESC'] = 'DESC',
+                        air_date: str = None,
+                        keyword: str = None,
+                        username: str = None,
+                        operator: str = None,
+                        **kwargs):
+        """获取预约列表，详见`TVSubscriber.get_order`"""
+        data = {
+            'index': index,
+            'count': count,
+            'order': order,
+        }
+        if air_date:
+            data['date'] = air_date
+        if keyword:
+            data['keyword'] = keyword
+        if username:
+            data['username'] = username
+        if operator:
+            data['operator'] = operator
+
+        self._last_resp = await self._post(_URL.GET_ORDER, content=_form(self._token_form, data), **kwargs)
+        self._check('获取预约列表失败！')
+        return self.last_json
+
+    def invalidate(self, method: str = None):
+        """
+        清除缓存，之后的调用会重新请求接口
+
+        Parameters
+        ----
+        method: str
+            要清除缓存的方法名，如`'get_channels'`，`'get_userinfo'`；为None时清除所有缓存
+        """
+        self._cache.invalidate(method)
+
+    async def close(self):
+        await self._client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def __repr__(self):
+        return f'AsyncTVSubscriber("{self._username}", "{self._password}", "{self._token}")'
@@ -1,54 +1,135 @@
 import datetime
+import sys
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
 from typing import Optional, Union
+from weakref import WeakValueDictionary
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, computed_field, field_validator
 
-from tvsubscriber.utils.const import NETWORKS
+from tvsubscriber.utils.const import API_TIMEZONE, NETWORKS
+
+
+# the api only ever sends zero-padded fixed-width iso-like strings, the C fromisoformat parsers are several times faster
+# than strptime or slicing. an EPG response spans only a few days and start times, so the results are also cached
+@lru_cache(maxsize=4096)
+def _parse_date(s: str) -> datetime.date:
+    # '%Y/%m/%d' or '%Y-%m-%d'
+    return datetime.date.fromisoformat(s.replace('/', '-'))
+
+
+@lru_cache(maxsize=4096)
+def _parse_time(s: str) -> datetime.time:
+    # '%H:%M:%S'
+    return datetime.time.fromisoformat(s)
+
+
+def _parse_datetime(s: str) -> datetime.datetime:
+    # '%Y-%m-%d %H:%M:%S', fromisoformat accepts the space separator
+    return datetime.datetime.fromisoformat(s)
+
+
+USE_IDENTITY_HASH = False
+"""
+为True时`Channel`与`Event`按对象身份哈希与比较，省去按字段计算，适合对大量快照做集合去重。
+需所有实例都由`get_or_create`创建，`TVSubscriber`解析的结果会自动经过`get_or_create`。
+注意与按字段比较并不完全一致：`get_or_create`只复用所有字段都相同的实例，key相同而其他字段不同
+（如刷新后的epgtoken、reservetoken）时会得到新实例，二者互不相等。
+`EventLite`不经过`get_or_create`，始终按key哈希与比较，`EventLite`之间仍可去重；但`Event`与其`to_lite()`结果互不相等，
+不能将二者混在同一集合中去重。
+须在创建任何实例前设置，不可中途切换
+"""
+
+# (model class, key) -> the single live instance, see `_get_or_create`
+_INSTANCES = WeakValueDictionary()
+
+
+def _get_or_create(obj):
+    key = (type(obj), obj._key)
+    existing = _INSTANCES.get(key)
+    # fields outside the key may differ, e.g. a refreshed epgtoken. keep such an instance distinct
+    if existing is not None and all(getattr(existing, name) == getattr(obj, name) for name in type(obj).model_fields):
+        return existing
+    _INSTANCES[key] = obj
+    return obj
+
+
+def _unique_instances(objs: list) -> list:
+    # route freshly parsed models through `_get_or_create` when identity hashing is on
+    if not USE_IDENTITY_HASH:
+        return objs
+    return [_get_or_create(obj) for obj in objs]
 
 
 class Channel(BaseModel):
     """频道"""
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
     service: str
     """频道名称"""
-    sid: int = Field(strict=False)
+    sid: int
     """频道SID"""
-    tsid: Optional[int] = Field(default=None, strict=False)
+    tsid: Optional[int] = None
     """频道TSID"""
     epgtoken: Optional[str] = None
     """请求EPG需要的token。可以被刷新，因此设为Optional"""
     network: NETWORKS
     """频道所属网络"""
 
+    @field_validator('service', 'network')
+    @classmethod
+    def _intern(cls, value: str) -> str:
+        # the same few names repeat across every channel list, share one str object each
+        return sys.intern(value)
+
+    @cached_property
+    def _key(self) -> tuple:
+        # identity used by __eq__ and __hash__. cached_property stores it in the instance __dict__,
+        # which is much faster to read than a pydantic PrivateAttr and is left out of model_dump
+        return self.service, self.network, self.sid, self.tsid
+
     def __hash__(self):
-        return hash((self.service, self.network, self.sid))
+        if USE_IDENTITY_HASH:
+            return id(self)
+        return hash(self._key)
 
     def __eq__(self, other):
+        if USE_IDENTITY_HASH:
+            return self is other
         # be careful with isinstance! packages imported from different levels would result in false.
-        return (
-            hasattr(other, 'service') and
-            hasattr(other, 'sid') and
-            hasattr(other, 'tsid') and
-            hasattr(other, 'network') and
-            self.service == other.service and
-            self.sid == other.sid and
-            (self.tsid is None and other.tsid is None or self.tsid == other.tsid) and
-            self.network == other.network
-        )
+        other_key = getattr(other, '_key', None)
+        if other_key is None:
+            return NotImplemented
+        return self._key == other_key
+
+    def model_copy(self, *, update: Optional[dict] = None, deep: bool = False) -> 'Channel':
+        copied = super().model_copy(update=update, deep=deep)
+        if update:
+            # cached properties live in the instance __dict__ and were copied along, drop them to recompute
+            copied.__dict__.pop('_key', None)
+        return copied
+
+    @classmethod
+    def get_or_create(cls, **kwargs) -> 'Channel':
+        """创建频道，若已存在字段完全相同的实例则返回该实例，见`USE_IDENTITY_HASH`"""
+        return _get_or_create(cls(**kwargs))
+
+
+CHANNEL_LIST_ADAPTER = TypeAdapter(list[Channel])
+"""一次性校验整个频道列表，比逐个构造`Channel`更快"""
 
 
 class Event(BaseModel):
     """节目"""
-    __FORMAT_STARTDATE__ = '%Y/%m/%d'
-    """节目播出日期解析格式"""
-    __FORMAT_STARTTIME__ = '%H:%M:%S'
-    """节目开始时间解析格式"""
-    sid: int = Field(strict=False)
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
+    sid: int
     """频道SID"""
-    tsid: int = Field(strict=False)
+    tsid: int
     """频道TSID"""
-    onid: int = Field(strict=False)
+    onid: int
     """频道ONID"""
-    eid: int = Field(strict=False)
+    eid: int
     """节目EID"""
     service: str
     """频道名称"""
@@ -56,8 +137,6 @@ class Event(BaseModel):
     """节目播出日期"""
     starttime: datetime.time
     """节目开始时间"""
-    timestamp: datetime.datetime
-    """节目开始时间戳"""
     week: str
     """星期（0-6）"""
     week_text: str
@@ -68,84 +147,169 @@ class Event(BaseModel):
     """节目名称"""
     event_text: str
     """节目说明"""
-    event_ext_text: str
-    """节目补充说明"""
+    event_ext_text: Optional[str] = Field(default=None, repr=False)
+    """节目补充说明，获取EPG时指定`include_ext_text=False`则为None"""
     category: Optional[str]
     """节目分类（英语）"""
     resolution: str
     """播出分辨率（1080i，480i）"""
     network: NETWORKS
     """频道所属网络（Kanto，Kansai，Nagoya，BS，CS）"""
-    price: Union[int, float] = Field(strict=False)
+    price: Union[int, float]
     """价格"""
     reservetoken: str
     """预约需要的token"""
 
-    def __init__(self, *, startdate: str, starttime: str, **kwargs):
-        try:
-            startdate = datetime.datetime.strptime(startdate, self.__FORMAT_STARTDATE__).date()
-        except ValueError:
-            startdate = datetime.datetime.strptime(startdate, '%Y-%m-%d').date()
-        starttime = datetime.datetime.strptime(starttime, self.__FORMAT_STARTTIME__).time()
-        super().__init__(startdate=startdate, starttime=starttime, **kwargs)
+    @field_validator('service', 'network', 'week_text', 'resolution', 'category')
+    @classmethod
+    def _intern(cls, value: Optional[str]) -> Optional[str]:
+        # repeated across thousands of events, share one str object each instead of one per event
+        return value if value is None else sys.intern(value)
+
+    # validators instead of overriding __init__, so that batch validation through `EVENT_LIST_ADAPTER` works as well.
+    # values may be already parsed, e.g. when validating an existing event's dump
+    @field_validator('startdate', mode='before')
+    @classmethod
+    def _validate_startdate(cls, value):
+        return _parse_date(value) if isinstance(value, str) else value
+
+    @field_validator('starttime', mode='before')
+    @classmethod
+    def _validate_starttime(cls, value):
+        return _parse_time(value) if isinstance(value, str) else value
+
+    @computed_field
+    @cached_property
+    def timestamp(self) -> datetime.datetime:
+        """节目开始时间戳（UTC）"""
+        # derived instead of stored, the api's timestamp is exactly startdate + starttime in `API_TIMEZONE`
+        return datetime.datetime.combine(self.startdate, self.starttime, API_TIMEZONE).astimezone(datetime.timezone.utc)
+
+    @cached_property
+    def _key(self) -> tuple:
+        # see `Channel._key`
+        return self.network, self.sid, self.tsid, self.onid, self.eid, self.price
 
     def __hash__(self):
-        return hash((self.network, self.sid, self.tsid, self.onid, self.eid, self.price))
+        if USE_IDENTITY_HASH:
+            return id(self)
+        return hash(self._key)
 
     def __eq__(self, other):
+        if USE_IDENTITY_HASH:
+            return self is other
         # be careful with isinstance! packages imported from different levels would result in false.
-        if (
-            hasattr(other, 'eid') and
-            hasattr(other, 'sid') and
-            hasattr(other, 'tsid') and
-            hasattr(other, 'onid') and
-            hasattr(other, 'price') and
-            hasattr(other, 'network')
-        ):
-            return (
-                self.eid == other.eid and
-                self.sid == other.sid and
-                self.tsid is None and other.tsid is None or self.tsid == other.tsid and
-                self.onid == other.onid and
-                self.price == other.price and
-                self.network == other.network
-            )
-        return False
+        other_key = getattr(other, '_key', None)
+        if other_key is None:
+            return NotImplemented
+        return self._key == other_key
+
+    def model_copy(self, *, update: Optional[dict] = None, deep: bool = False) -> 'Event':
+        copied = super().model_copy(update=update, deep=deep)
+        if update:
+            # see `Channel.model_copy`
+            copied.__dict__.pop('_key', None)
+            copied.__dict__.pop('timestamp', None)
+        return copied
+
+    @classmethod
+    def get_or_create(cls, **kwargs) -> 'Event':
+        """创建节目，若已存在字段完全相同的实例则返回该实例，见`USE_IDENTITY_HASH`"""
+        return _get_or_create(cls(**kwargs))
+
+    def to_lite(self) -> 'EventLite':
+        """只保留去重与预约所需字段，见`EventLite`"""
+        return EventLite(self.sid, self.tsid, self.onid, self.eid, self.price, self.network, self.reservetoken,
+                         self.timestamp)
+
+
+EVENT_LIST_ADAPTER = TypeAdapter(list[Event])
+"""一次性校验整个节目列表，比逐个构造`Event`更快"""
+
+
+@dataclass(frozen=True, eq=False)
+class EventLite:
+    """
+    节目的精简版本，只包含去重与预约（`TVSubscriber.subscribe`）所需的字段，
+    大批量抓取EPG时占用内存远小于`Event`。按key相等与哈希（同`Event`），`USE_IDENTITY_HASH`下的差异见其说明
+    """
+    # explicit __slots__ instead of dataclass(slots=True) to stay compatible with python 3.9
+    __slots__ = ('sid', 'tsid', 'onid', 'eid', 'price', 'network', 'reservetoken', 'timestamp')
+    sid: int
+    """频道SID"""
+    tsid: int
+    """频道TSID"""
+    onid: int
+    """频道ONID"""
+    eid: int
+    """节目EID"""
+    price: Union[int, float]
+    """价格"""
+    network: NETWORKS
+    """频道所属网络"""
+    reservetoken: str
+    """预约需要的token"""
+    timestamp: datetime.datetime
+    """节目开始时间戳"""
+
+    @property
+    def _key(self) -> tuple:
+        # same as `Event._key`, not cached to keep instances small
+        return self.network, self.sid, self.tsid, self.onid, self.eid, self.price
+
+    def __hash__(self):
+        return hash(self._key)
+
+    def __eq__(self, other):
+        if USE_IDENTITY_HASH and hasattr(other, 'to_lite'):
+            # `Event` compares by identity, leave it to `Event.__eq__` to stay symmetric
+            return NotImplemented
+        other_key = getattr(other, '_key', None)
+        if other_key is None:
+            return NotImplemented
+        return self._key == other_key
+
+    def __reduce__(self):
+        # default pickling of __slots__ sets attributes one by one, which a frozen dataclass refuses
+        return EventLite, tuple(getattr(self, name) for name in self.__slots__)
 
 
 class Reservation(BaseModel):
     """预约结果"""
-    __FORMAT_STARTTIME__: str = '%Y-%m-%d %H:%M:%S'
-    """节目开始时间解析格式"""
-    sid: int = Field(strict=False)
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
+    sid: int
     """频道SID"""
-    eid: int = Field(strict=False)
+    eid: int
     """节目EID"""
     service: str
     """频道名称"""
     starttime: datetime.datetime
     """节目开始日期时间"""
-    duration: Union[int, float] = Field(strict=False)
+    duration: Union[int, float]
     """时长（分钟）"""
-    price: Union[int, float] = Field(strict=False)
+    price: Union[int, float]
     """价格"""
-    resid: int = Field(strict=False)
+    resid: int
     """预约ID"""
-    orderid: int = Field(strict=False)
+    orderid: int
     """订单ID"""
     server: int
     """已预约服务器编号"""
-    def __init__(self, *, starttime: str, **kwargs):
-        starttime = datetime.datetime.strptime(starttime, self.__FORMAT_STARTTIME__)
-        super().__init__(starttime=starttime, **kwargs)
+
+    @field_validator('starttime', mode='before')
+    @classmethod
+    def _validate_starttime(cls, value):
+        # see `Event._validate_startdate`
+        return _parse_datetime(value) if isinstance(value, str) else value
 
 
 class UserInfo(BaseModel):
     """用户信息"""
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
     __ONLINE__: str = '1'
     """在线状态"""
-    __FORMAT_LASTTIME__: str = '%Y-%m-%d %H:%M:%S'
-    """上次登录时间解析格式"""
     id: int
     """用户ID"""
     username: str
@@ -168,6 +332,9 @@ class UserInfo(BaseModel):
     """上次登录日期时间"""
     times_draw: Optional[str] = None
     """剩余抽奖次数"""
-    def __init__(self, *, lasttime: str, **kwargs):
-        lasttime = datetime.datetime.strptime(lasttime, self.__FORMAT_LASTTIME__)
-        super().__init__(lasttime=lasttime, **kwargs)
+
+    @field_validator('lasttime', mode='before')
+    @classmethod
+    def _validate_lasttime(cls, value):
+        # see `Event._validate_startdate`
+        return _parse_datetime(value) if isinstance(value, str) else value
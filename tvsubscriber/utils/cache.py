@@ -0,0 +1,39 @@
+import time
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    带过期时间的内存缓存，键为tuple，第一项为缓存所属的方法名，如`('get_channels', 'Kanto')`
+
+    超过`maxsize`时丢弃最早写入的条目，`maxsize`为0时不缓存
+    """
+    def __init__(self, maxsize: int = 256, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = {}  # type: dict[tuple, tuple[float, Any]]
+
+    def get(self, key: tuple[Hashable, ...], ttl: float = None) -> Optional[Any]:
+        """返回未过期的缓存值，不存在或已过期时返回None。ttl为None时使用默认有效期"""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if time.monotonic() - item[0] >= (self.ttl if ttl is None else ttl):
+            del self._data[key]
+            return None
+        return item[1]
+
+    def set(self, key: tuple[Hashable, ...], value: Any):
+        # re-insert so that insertion order stays oldest-first
+        self._data.pop(key, None)
+        self._data[key] = (time.monotonic(), value)
+        while len(self._data) > self.maxsize:
+            del self._data[next(iter(self._data))]
+
+    def invalidate(self, method: str = None):
+        """清除指定方法的缓存，method为None时清空所有缓存"""
+        if method is None:
+            self._data.clear()
+            return
+        for key in [key for key in self._data if key[0] == method]:
+            del self._data[key]
@@ -1,22 +1,47 @@
+import datetime
+import sys
+from importlib.util import find_spec
 from pathlib import Path
-from typing import Literal
+from typing import Final, Literal, get_args
 
-from httpx import URL
-
-MLSUB = URL('https://rec.mlsub.net/api/user')
+# plain strings so that importing constants does not pull in httpx, which resolves them against `base_url` itself
+MLSUB: Final = 'https://rec.mlsub.net/api/user'
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:108.0) Gecko/20100101 Firefox/108.0'
 
 
 class API:
-    LOGIN = URL('/login.php')
-    GET_CHANNEL = URL('/get-channel.php')
-    GET_EPG = URL('/get-epg.php')
-    SUBSCRIBE = URL('/addres.php')
-    USERINFO = URL('/userinfo.php')
-    GET_ORDER = URL('/get-order.php')
+    LOGIN: Final = '/login.php'
+    GET_CHANNEL: Final = '/get-channel.php'
+    GET_EPG: Final = '/get-epg.php'
+    SUBSCRIBE: Final = '/addres.php'
+    USERINFO: Final = '/userinfo.php'
+    GET_ORDER: Final = '/get-order.php'
 
 
 ROOT = Path(__file__).parents[1]
 
+API_TIMEZONE = datetime.timezone(datetime.timedelta(hours=8))
+"""接口返回的日期、时间所在时区（UTC+8），节目时间戳即以此时区解释`startdate`与`starttime`"""
+
+HTTP2_AVAILABLE = find_spec('h2') is not None
+"""是否已安装`h2`（`pip install httpx[http2]`），未安装时退回HTTP/1.1"""
+
+CONNECT_RETRIES = 3
+"""建立连接失败时由httpx transport重试的次数"""
+MAX_RETRIES = 4
+"""请求因网络错误或`RETRY_STATUS`失败时的最大重试次数"""
+RETRY_BACKOFF = 0.25
+"""第n次重试前等待`RETRY_BACKOFF * 2 ** n`秒"""
+RETRY_STATUS = frozenset((429, 500, 502, 503, 504))
+"""需要重试的HTTP状态码"""
+
+CACHE_TTL_CHANNELS = 300
+"""频道列表缓存有效期（秒）"""
+CACHE_TTL_USERINFO = 30
+"""用户信息缓存有效期（秒）"""
+CACHE_TTL_ONLINE = 5
+"""在线状态缓存有效期（秒）"""
+
 NETWORK_NAMES = {
     'Kanto': '关东广域',
     'Kansai': '近畿（关西）广域',
@@ -28,3 +53,5 @@ NETWORK_NAMES = {
     'CS124': 'CS124'
 }
 NETWORKS = Literal['Kanto', 'Kansai', 'Nagoya', 'Hokaido', 'Other', 'BS', 'CS', 'CS124']
+NETWORKS_SET = frozenset(map(sys.intern, get_args(NETWORKS)))
+"""`NETWORKS`的全部取值，用于运行时判断网络名是否有效"""